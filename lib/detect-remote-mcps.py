@@ -16,93 +16,122 @@ import os
 from pathlib import Path
 from typing import Dict, List, Tuple, Any
 
-def strip_jsonc_comments(content: str) -> str:
-    """Remove comments and trailing commas from JSONC to make it valid JSON."""
-    result = []
-    in_string = False
-    in_single_line_comment = False
-    in_multi_line_comment = False
-    escape_next = False
-    
-    i = 0
-    while i < len(content):
-        char = content[i]
-        next_char = content[i + 1] if i + 1 < len(content) else None
-        
-        # Handle escape sequences in strings
-        if in_string and escape_next:
-            result.append(char)
-            escape_next = False
-            i += 1
-            continue
-        
-        if in_string and char == '\\':
-            result.append(char)
-            escape_next = True
-            i += 1
-            continue
-        
-        # Handle string boundaries
-        if char == '"' and not in_single_line_comment and not in_multi_line_comment:
-            in_string = not in_string
-            result.append(char)
-            i += 1
-            continue
-        
-        # If we're in a string, just copy the character
-        if in_string:
-            result.append(char)
-            i += 1
-            continue
-        
-        # Handle multi-line comment end
-        if in_multi_line_comment:
-            if char == '*' and next_char == '/':
-                in_multi_line_comment = False
-                i += 2
-                continue
-            i += 1
-            continue
-        
-        # Handle single-line comment end
-        if in_single_line_comment:
-            if char == '\n':
-                in_single_line_comment = False
-                result.append(char)
-            i += 1
+# orjson parses in C and is several times faster than stdlib json, but it's
+# an optional install - fall back to stdlib when it isn't available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# pyahocorasick matches all host patterns in one C-level scan; optional like
+# orjson, with the compiled regex as fallback
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Matches string literals (captured, so they survive untouched), single-line
+# comments, and multi-line comments. The string alternative must come first so
+# quoted content (including escaped quotes and "//" inside strings) is never
+# mistaken for a comment.
+_JSONC_RE = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.S)
+
+# Trailing commas before a closing brace/bracket (legal in JSONC, not JSON)
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+
+# Matches a whole-word localhost/127.0.0.1 reference (in a URL, after user@,
+# or standalone) so e.g. 'localhostname' is left alone
+_LOCALHOST_RE = re.compile(r'(?:(?<=://)|(?<=@)|\b)(?:localhost|127\.0\.0\.1)\b')
+
+_DOCKER_HOST = 'host.docker.internal'
+
+if ahocorasick is not None:
+    _LOCALHOST_AC = ahocorasick.Automaton()
+    for _word in ('localhost', '127.0.0.1'):
+        _LOCALHOST_AC.add_word(_word, len(_word))
+    _LOCALHOST_AC.make_automaton()
+else:
+    _LOCALHOST_AC = None
+
+def _is_boundary(char: str) -> bool:
+    """True if char can't extend a hostname (mirrors the regex \\b rule)."""
+    return not (char.isalnum() or char == '_')
+
+def _xlate(value: str) -> str:
+    """Rewrite localhost/127.0.0.1 references to host.docker.internal."""
+    if _LOCALHOST_AC is None:
+        return _LOCALHOST_RE.sub(_DOCKER_HOST, value)
+
+    # Aho-Corasick finds both patterns in a single scan; apply the same
+    # word-boundary rule as the regex so e.g. 'localhostname' survives
+    parts = []
+    last = 0
+    for end, length in _LOCALHOST_AC.iter(value):
+        start = end - length + 1
+        if start < last:
             continue
-        
-        # Check for comment starts
-        if char == '/' and next_char == '/':
-            in_single_line_comment = True
-            i += 2
+        if start > 0 and not _is_boundary(value[start - 1]):
             continue
-        
-        if char == '/' and next_char == '*':
-            in_multi_line_comment = True
-            i += 2
+        if end + 1 < len(value) and not _is_boundary(value[end + 1]):
             continue
-        
-        # Copy non-comment content
-        result.append(char)
-        i += 1
-    
-    # Join and remove trailing commas
-    content = ''.join(result)
-    content = re.sub(r',(\s*[}\]])', r'\1', content)
-    
+        parts.append(value[last:start])
+        parts.append(_DOCKER_HOST)
+        last = end + 1
+    if not parts:
+        return value
+    parts.append(value[last:])
+    return ''.join(parts)
+
+def _map_strings(node: Any, fn, counter: List[int]) -> Any:
+    """
+    Apply fn to every string in a nested dict/list structure, in place where
+    possible. counter[0] is incremented for each string fn actually changed.
+    """
+    if isinstance(node, str):
+        new = fn(node)
+        if new != node:
+            counter[0] += 1
+        return new
+    if isinstance(node, list):
+        for i, item in enumerate(node):
+            node[i] = _map_strings(item, fn, counter)
+        return node
+    if isinstance(node, dict):
+        for key, value in node.items():
+            node[key] = _map_strings(value, fn, counter)
+        return node
+    return node
+
+def strip_jsonc_comments(content: str) -> str:
+    """Remove comments and trailing commas from JSONC to make it valid JSON."""
+    # Fast path: no '/' anywhere means no comments, so skip the regex pass.
+    # The membership test is a single memchr-style scan in C.
+    if '/' in content:
+        # Drop comments, keep string literals verbatim
+        content = _JSONC_RE.sub(lambda m: m.group(1) or '', content)
+
+    # Remove trailing commas
+    content = _TRAILING_COMMA_RE.sub(r'\1', content)
+
     return content
 
-def parse_jsonc(file_path: str) -> Dict:
-    """Parse a JSONC file (JSON with comments)."""
+def parse_jsonc(file_path: str) -> Tuple[Dict, str]:
+    """
+    Parse a JSONC file (JSON with comments).
+
+    Returns tuple of (config, raw_text) so callers can reuse the original
+    text (e.g. to preserve leading comments) without re-reading the file.
+    """
     with open(file_path, 'r') as f:
         content = f.read()
-    
+
     # Strip comments and trailing commas
     clean_content = strip_jsonc_comments(content)
-    
+
     try:
-        return json.loads(clean_content)
+        if orjson is not None:
+            return orjson.loads(clean_content), content
+        return json.loads(clean_content), content
     except json.JSONDecodeError as e:
         print(f"Error parsing JSON: {e}", file=sys.stderr)
         print(f"Content around error: {clean_content[max(0, e.pos-50):e.pos+50]}", file=sys.stderr)
@@ -126,47 +155,30 @@ def detect_remote_mcps(config: Dict) -> Dict[str, str]:
         # Don't skip disabled servers - they can be enabled at runtime
         # and need to be configured in mcp-proxy for OAuth to work
         
-        command = server_config.get('command', [])
-        args = server_config.get('args', [])
-        
-        # Convert to list if string
-        if isinstance(command, str):
-            command = [command]
-        if isinstance(args, str):
-            args = [args]
-        
-        # Check if this is a remote MCP using mcp-remote
-        is_remote = False
-        remote_url = None
-        
-        # Pattern 1: ["npx", "-y", "mcp-remote", "https://..."]
-        if len(command) >= 3 and command[0] == "npx" and "mcp-remote" in command:
-            # URL might be in command or args
-            for item in command + args:
-                if isinstance(item, str) and item.startswith('http'):
-                    remote_url = item
-                    is_remote = True
-                    break
-        
-        # Pattern 2: ["mcp-remote", "https://..."]
-        elif len(command) >= 1 and command[0] == "mcp-remote":
-            for item in command[1:] + args:
-                if isinstance(item, str) and item.startswith('http'):
-                    remote_url = item
-                    is_remote = True
-                    break
-        
-        # Pattern 3: command is something else but args contain a URL
-        elif args:
-            for item in args:
-                if isinstance(item, str) and item.startswith('http'):
-                    # Check if this looks like a remote MCP URL
-                    if 'mcp' in item.lower():
-                        remote_url = item
-                        is_remote = True
-                        break
-        
-        if is_remote and remote_url:
+        # Empty-tuple defaults avoid allocating a fresh list on every miss
+        command = server_config.get('command', ())
+        args = server_config.get('args', ())
+
+        # Flatten command + args into a single token sequence
+        tokens = list(command if isinstance(command, (list, tuple)) else [command])
+        tokens += args if isinstance(args, (list, tuple)) else [args]
+
+        # Patterns like ["npx", "-y", "mcp-remote", ...] or ["mcp-remote", ...]
+        # are remote regardless of what the URL looks like; for anything else
+        # we only accept URLs that look like MCP endpoints
+        head = tokens[0] if tokens else ''
+        looks_like_remote = head == 'mcp-remote' or \
+                            (head == 'npx' and 'mcp-remote' in tokens)
+
+        # Single pass with early exit: take the first URL token that qualifies
+        remote_url = next(
+            (item for item in tokens
+             if isinstance(item, str) and item.startswith('http')
+             and (looks_like_remote or 'mcp' in item.lower())),
+            None
+        )
+
+        if remote_url:
             remote_mcps[name] = remote_url
     
     return remote_mcps
@@ -189,67 +201,42 @@ def generate_mcp_proxy_config(remote_mcps: Dict[str, str]) -> Dict:
     
     return {"mcpServers": servers}
 
-def translate_localhost_urls(config: Dict, use_docker: bool = True) -> Tuple[Dict, int]:
+def translate_localhost_urls(config: Dict, use_docker: bool = True, skip=()) -> Tuple[Dict, int]:
     """
     Translate localhost/127.0.0.1 URLs to host.docker.internal for Docker.
-    
+
+    Server names in skip are left untouched (e.g. entries the caller just
+    generated that already point at the Docker host).
+
     Returns tuple of (updated_config, count_of_translations)
     """
     if not use_docker:
         return config, 0
-    
+
     # Try both 'mcp' and 'mcpServers' keys
     mcp_key = 'mcp' if 'mcp' in config else 'mcpServers'
     mcp_servers = config.get(mcp_key, {})
-    
-    translations = 0
-    
+
+    # Cheap pre-check: one compact serialization and two C-level substring
+    # tests beat a recursive walk when there's nothing to translate
+    blob = json.dumps(mcp_servers, separators=(',', ':'))
+    if 'localhost' not in blob and '127.0.0.1' not in blob:
+        return config, 0
+
+    counter = [0]
+
     for name, server_config in mcp_servers.items():
-        if not isinstance(server_config, dict):
+        if name in skip or not isinstance(server_config, dict):
             continue
-        
-        # Check if this is a remote type with a URL
-        if server_config.get('type') == 'remote' and 'url' in server_config:
-            url = server_config['url']
-            
-            # Replace localhost and 127.0.0.1 with host.docker.internal
-            updated_url = url
-            updated_url = re.sub(r'://localhost\b', '://host.docker.internal', updated_url)
-            updated_url = re.sub(r'://127\.0\.0\.1\b', '://host.docker.internal', updated_url)
-            
-            if updated_url != url:
-                server_config['url'] = updated_url
-                translations += 1
-                print(f"  Translated {name}: {url} -> {updated_url}")
-        
-        # Also check in command/args for URLs (e.g., in environment variables)
-        # This handles cases where URL is passed as an argument
-        for key in ['command', 'args', 'env']:
-            if key in server_config:
-                value = server_config[key]
-                if isinstance(value, str):
-                    updated = value.replace('localhost', 'host.docker.internal')
-                    updated = updated.replace('127.0.0.1', 'host.docker.internal')
-                    if updated != value:
-                        server_config[key] = updated
-                        translations += 1
-                elif isinstance(value, list):
-                    for i, item in enumerate(value):
-                        if isinstance(item, str):
-                            updated = item.replace('localhost', 'host.docker.internal')
-                            updated = updated.replace('127.0.0.1', 'host.docker.internal')
-                            if updated != item:
-                                value[i] = updated
-                                translations += 1
-                elif isinstance(value, dict):
-                    for k, v in value.items():
-                        if isinstance(v, str):
-                            updated = v.replace('localhost', 'host.docker.internal')
-                            updated = updated.replace('127.0.0.1', 'host.docker.internal')
-                            if updated != v:
-                                value[k] = updated
-                                translations += 1
-    
+
+        # One recursive pass covers remote URLs, command/args, and env values
+        # at any nesting depth
+        before = counter[0]
+        _map_strings(server_config, _xlate, counter)
+        if counter[0] > before:
+            print(f"  Translated {counter[0] - before} reference(s) in {name}")
+
+    translations = counter[0]
     config[mcp_key] = mcp_servers
     return config, translations
 
@@ -265,11 +252,12 @@ def update_opencode_config(config: Dict, remote_mcps: Dict[str, str], proxy_port
     
     host = "host.docker.internal" if use_docker else "localhost"
     
-    for name in remote_mcps.keys():
-        if name in mcp_servers:
+    for name in remote_mcps:
+        entry = mcp_servers.get(name)
+        if entry is not None:
             # Preserve the original enabled state
-            original_enabled = mcp_servers[name].get('enabled', True)
-            
+            original_enabled = entry.get('enabled', True)
+
             # Update to use mcp-proxy SSE endpoint
             # Use type: "remote" since mcp-proxy exposes an SSE server
             mcp_servers[name] = {
@@ -280,10 +268,12 @@ def update_opencode_config(config: Dict, remote_mcps: Dict[str, str], proxy_port
     
     config[mcp_key] = mcp_servers
     
-    # Also translate any other localhost references
+    # Also translate any other localhost references. The proxy entries we
+    # just wrote already point at the Docker host, so skip re-walking them.
     if use_docker:
         print("\nTranslating localhost/127.0.0.1 URLs for Docker...")
-        config, count = translate_localhost_urls(config, use_docker)
+        config, count = translate_localhost_urls(config, use_docker,
+                                                 skip=frozenset(remote_mcps))
         if count > 0:
             print(f"✓ Translated {count} localhost reference(s)")
         else:
@@ -291,32 +281,41 @@ def update_opencode_config(config: Dict, remote_mcps: Dict[str, str], proxy_port
     
     return config
 
-def write_jsonc(file_path: str, config: Dict):
-    """Write config back as JSONC (with nice formatting)."""
-    leading_comments = []
-    
+def write_jsonc(file_path: str, config: Dict, leading_raw: str = None):
+    """
+    Write config back as JSONC (with nice formatting).
+
+    leading_raw is the original JSONC text whose leading comments should be
+    preserved; when omitted, the existing file at file_path is read instead.
+    """
     # Read original file to preserve comments at the top (if it exists)
-    if os.path.exists(file_path):
+    if leading_raw is None and os.path.exists(file_path):
         with open(file_path, 'r') as f:
-            original = f.read()
-        
-        # Extract leading comments
-        for line in original.split('\n'):
+            leading_raw = f.read()
+
+    # Extract leading comments (stops at the first content line, so we never
+    # iterate the whole file)
+    leading_comments = []
+    if leading_raw is not None:
+        for line in leading_raw.splitlines():
             stripped = line.strip()
             if stripped.startswith('//') or stripped.startswith('/*') or not stripped:
                 leading_comments.append(line)
             else:
                 break
     
-    # Write new config
-    with open(file_path, 'w') as f:
-        # Write leading comments
-        if leading_comments:
-            f.write('\n'.join(leading_comments) + '\n')
-        
-        # Write JSON with nice formatting
-        json.dump(config, f, indent=4)
-        f.write('\n')
+    # Serialize everything up front, then write in one pass. json.dump with
+    # indent set emits many small writes through the text layer; a single
+    # large binary write avoids that syscall churn.
+    parts = []
+    if leading_comments:
+        parts.append('\n'.join(leading_comments) + '\n')
+    parts.append(json.dumps(config, indent=4))
+    parts.append('\n')
+    payload = ''.join(parts).encode('utf-8')
+
+    with open(file_path, 'wb', buffering=1 << 20) as f:
+        f.write(payload)
 
 def main():
     import argparse
@@ -345,7 +344,7 @@ def main():
     
     # Parse config
     print(f"Reading config from: {args.config}")
-    config = parse_jsonc(args.config)
+    config, raw_text = parse_jsonc(args.config)
     
     # Detect remote MCPs
     print("\nDetecting remote MCP servers...")
@@ -385,18 +384,23 @@ def main():
         source_dir = os.path.dirname(args.config)
         if os.path.exists(source_dir):
             print(f"Copying config from {source_dir} to {docker_config_dir}")
-            # Copy all files except the main config (we'll create that separately)
-            for item in os.listdir(source_dir):
-                if item == 'opencode.jsonc':
-                    continue
-                src = os.path.join(source_dir, item)
-                dst = os.path.join(docker_config_dir, item)
-                if os.path.isfile(src):
-                    shutil.copy2(src, dst)
-                elif os.path.isdir(src):
-                    if os.path.exists(dst):
-                        shutil.rmtree(dst)
-                    shutil.copytree(src, dst)
+            # Copy all files except the main config (we'll create that separately).
+            # scandir's DirEntry caches file types from the directory read,
+            # avoiding a stat call per regular entry; symlinks are followed
+            # and their targets copied, as before.
+            with os.scandir(source_dir) as entries:
+                for entry in entries:
+                    if entry.name == 'opencode.jsonc':
+                        continue
+                    dst = os.path.join(docker_config_dir, entry.name)
+                    if entry.is_file():
+                        shutil.copy2(entry.path, dst)
+                    elif entry.is_dir():
+                        if os.path.islink(dst):
+                            os.unlink(dst)
+                        elif os.path.lexists(dst):
+                            shutil.rmtree(dst)
+                        shutil.copytree(entry.path, dst)
     
     # Update config for Docker (this also translates localhost URLs)
     updated_config = update_opencode_config(config, remote_mcps, args.port, args.docker)
@@ -406,7 +410,7 @@ def main():
         print(f"\n=== DRY RUN: Docker config {mcp_key} ===")
         print(json.dumps(updated_config.get(mcp_key, {}), indent=2))
     else:
-        write_jsonc(args.docker_config, updated_config)
+        write_jsonc(args.docker_config, updated_config, raw_text)
         print(f"✓ Created Docker config: {args.docker_config}")
         print(f"✓ Original config unchanged: {args.config}")
     
@@ -21,6 +21,9 @@ import socket
 import subprocess
 import signal
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Configure logging
@@ -37,12 +40,40 @@ DEFAULT_SOCKET_PATH = '/tmp/git-credential-proxy.sock'
 # Use git's credential-osxkeychain subcommand
 GIT_CREDENTIAL_HELPER = ['git', 'credential-osxkeychain']
 
+# Number of credential requests handled concurrently
+MAX_WORKERS = 8
+
+# How long a successful 'get' response is reused before asking the keychain
+# again (seconds). Spawning git credential-osxkeychain costs tens of ms,
+# which dominates latency for repeated fetches/pushes.
+CACHE_TTL = 60
+
 
 class GitCredentialProxy:
     def __init__(self, socket_path):
         self.socket_path = socket_path
         self.server_socket = None
         self.running = False
+        self.executor = None
+        # (protocol, host, username, path) -> (response_bytes, timestamp),
+        # guarded by _cache_lock
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def _credential_key(credential_data):
+        """Extract a (protocol, host, username, path) cache key from credential protocol data"""
+        # username and path distinguish multi-account setups on the same host
+        # (and credential.useHttpPath users); they stay None when not sent
+        fields = {'protocol': None, 'host': None, 'username': None, 'path': None}
+        for line in credential_data.splitlines():
+            key, sep, value = line.partition('=')
+            if sep and key in fields:
+                fields[key] = value.strip()
+        if fields['protocol'] and fields['host']:
+            return (fields['protocol'], fields['host'],
+                    fields['username'], fields['path'])
+        return None
         
     def cleanup_socket(self):
         """Remove existing socket file if it exists"""
@@ -59,21 +90,25 @@ class GitCredentialProxy:
         try:
             # Read the request from the client
             # Git credential protocol sends key=value pairs terminated by blank line
-            request_data = b''
+            request_data = bytearray()
             while True:
                 chunk = client_socket.recv(4096)
                 if not chunk:
                     break
-                request_data += chunk
-                # Check if we have a complete request (ends with \n\n)
-                if b'\n\n' in request_data or b'\r\n\r\n' in request_data:
+                request_data.extend(chunk)
+                # Check if we have a complete request (ends with \n\n).
+                # Only scan the tail: the terminator can span at most the
+                # last 3 bytes of previously received data.
+                search_from = max(0, len(request_data) - len(chunk) - 3)
+                if (request_data.find(b'\n\n', search_from) >= 0
+                        or request_data.find(b'\r\n\r\n', search_from) >= 0):
                     break
-            
+
             if not request_data:
                 logger.debug("Empty request received")
                 return
-            
-            request_str = request_data.decode('utf-8')
+
+            request_str = bytes(request_data).decode('utf-8')
             logger.debug(f"Received request:\n{request_str}")
             
             # Parse operation from first line
@@ -90,7 +125,28 @@ class GitCredentialProxy:
                 return
             
             logger.debug(f"Operation: {operation}")
-            
+
+            cache_key = self._credential_key(credential_data)
+
+            # Serve recent 'get' responses from the cache to avoid the
+            # fork+exec cost of the credential helper on every request
+            if operation == 'get' and cache_key:
+                with self._cache_lock:
+                    cached = self._cache.get(cache_key)
+                if cached and time.monotonic() - cached[1] < CACHE_TTL:
+                    client_socket.sendall(cached[0])
+                    logger.debug(f"Sent cached response for {cache_key}")
+                    return
+
+            # 'store' and 'erase' change the keychain, so drop everything
+            # cached for this protocol+host - including entries cached
+            # without a username, whose answer may have come from the
+            # account just changed
+            if operation in ('store', 'erase') and cache_key:
+                with self._cache_lock:
+                    for key in [k for k in self._cache if k[:2] == cache_key[:2]]:
+                        del self._cache[key]
+
             # Forward to git-credential-osxkeychain
             process = None
             try:
@@ -109,6 +165,9 @@ class GitCredentialProxy:
                 
                 # Send response back to client
                 if stdout:
+                    if operation == 'get' and cache_key:
+                        with self._cache_lock:
+                            self._cache[cache_key] = (stdout, time.monotonic())
                     client_socket.sendall(stdout)
                     logger.debug(f"Sent response ({len(stdout)} bytes)")
                 else:
@@ -148,13 +207,17 @@ class GitCredentialProxy:
         logger.info(f"Using credential helper: {GIT_CREDENTIAL_HELPER}")
         
         self.running = True
-        
+
+        # Handle requests on a thread pool so one slow credential helper
+        # (communicate can block up to 30s) doesn't serialize other clients
+        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
         # Accept connections
         while self.running:
             try:
                 client_socket, _ = self.server_socket.accept()
                 logger.debug("Client connected")
-                self.handle_credential_request(client_socket)
+                self.executor.submit(self.handle_credential_request, client_socket)
             except KeyboardInterrupt:
                 logger.info("Received interrupt signal")
                 break
@@ -168,7 +231,11 @@ class GitCredentialProxy:
         """Stop the proxy server"""
         logger.info("Stopping git credential proxy")
         self.running = False
-        
+
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
         if self.server_socket:
             try:
                 self.server_socket.close()
@@ -14,19 +14,21 @@ Security features:
 """
 
 import sys
+import hmac
 import json
 import subprocess
 import uuid
 import os
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs
 from pathlib import Path
 
 # Configuration
 MAX_URL_LENGTH = 4096
-ALLOWED_SCHEMES = {'http', 'https', 'file'}
+ALLOWED_SCHEMES = frozenset({'http', 'https', 'file'})
 CONFIG_DIR = None  # Will be set from command line
 AUTH_TOKEN = None  # Will be generated
+AUTH_TOKEN_BYTES = None  # Encoded once at startup
 
 
 class URLOpenerHandler(BaseHTTPRequestHandler):
@@ -38,18 +40,19 @@ class URLOpenerHandler(BaseHTTPRequestHandler):
     
     def do_POST(self):
         """Handle POST requests to open URLs"""
-        if self.path != '/open':
+        path, _, query = self.path.partition('?')
+        if path != '/open':
             self.send_error(404, "Not Found")
             return
         
         # Check authentication
-        auth_header = self.headers.get('Authorization', '')
-        if not auth_header.startswith('Bearer '):
+        auth_header = self.headers.get('Authorization', '').encode()
+        if not auth_header.startswith(b'Bearer '):
             self.send_error(401, "Unauthorized: Missing Bearer token")
             return
-        
-        token = auth_header[7:]  # Remove 'Bearer ' prefix
-        if token != AUTH_TOKEN:
+
+        # Constant-time comparison to avoid leaking the token via timing
+        if not hmac.compare_digest(auth_header[7:], AUTH_TOKEN_BYTES):
             self.send_error(403, "Forbidden: Invalid token")
             return
         
@@ -68,7 +71,7 @@ class URLOpenerHandler(BaseHTTPRequestHandler):
         
         # Validate URL
         url = data.get('url', '')
-        if not url:
+        if not url or not isinstance(url, str):
             self.send_error(400, "Bad Request: Missing 'url' field")
             return
         
@@ -76,32 +79,41 @@ class URLOpenerHandler(BaseHTTPRequestHandler):
             self.send_error(413, "URL Too Long")
             return
         
-        # Parse and validate URL scheme
-        try:
-            parsed = urlparse(url)
-            if parsed.scheme not in ALLOWED_SCHEMES:
-                self.send_error(400, f"Bad Request: Scheme '{parsed.scheme}' not allowed. Allowed: {ALLOWED_SCHEMES}")
-                return
-        except Exception as e:
-            self.send_error(400, f"Bad Request: Invalid URL - {e}")
+        # Validate URL scheme. Only the scheme matters here (open(1) gets the
+        # raw URL anyway), so slice it out directly instead of a full urlparse.
+        colon = url.find(':')
+        scheme = url[:colon].lower() if 0 < colon < 16 else ''
+        if scheme not in ALLOWED_SCHEMES:
+            self.send_error(400, f"Bad Request: Scheme '{scheme}' not allowed. Allowed: {set(ALLOWED_SCHEMES)}")
             return
         
         # Open URL using macOS 'open' command
         try:
-            # Use subprocess with shell=False to prevent injection
-            result = subprocess.run(
-                ['open', url],
-                capture_output=True,
-                text=True,
-                timeout=5,
-                check=False
-            )
-            
-            if result.returncode != 0:
-                self.log_message(f"Warning: 'open' command failed with code {result.returncode}: {result.stderr}")
-                self.send_error(500, f"Failed to open URL: {result.stderr}")
-                return
-            
+            # Use subprocess with shell=False to prevent injection.
+            # open(1) just hands the URL to LaunchServices, so by default we
+            # don't wait for it; pass ?sync=1 to wait and report failures.
+            sync = parse_qs(query).get('sync', ['0'])[0] == '1'
+            if sync:
+                result = subprocess.run(
+                    ['open', url],
+                    capture_output=True,
+                    text=True,
+                    timeout=5,
+                    check=False
+                )
+
+                if result.returncode != 0:
+                    self.log_message(f"Warning: 'open' command failed with code {result.returncode}: {result.stderr}")
+                    self.send_error(500, f"Failed to open URL: {result.stderr}")
+                    return
+            else:
+                subprocess.Popen(
+                    ['open', url],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL
+                )
+
             # Success
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
@@ -147,7 +159,7 @@ def write_config(port, token, config_dir):
 
 
 def main():
-    global CONFIG_DIR, AUTH_TOKEN
+    global CONFIG_DIR, AUTH_TOKEN, AUTH_TOKEN_BYTES
     
     if len(sys.argv) != 2:
         print("Usage: host-url-opener.py <config_dir>", file=sys.stderr)
@@ -168,9 +180,11 @@ def main():
     
     # Generate random token
     AUTH_TOKEN = str(uuid.uuid4())
+    AUTH_TOKEN_BYTES = AUTH_TOKEN.encode()
     
     # Create server with random port (0 = let OS choose)
-    server = HTTPServer(('127.0.0.1', 0), URLOpenerHandler)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), URLOpenerHandler)
+    server.daemon_threads = True
     actual_port = server.server_port
     
     # Write config for container